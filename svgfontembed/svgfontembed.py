@@ -2,24 +2,116 @@ from __future__ import annotations
 
 import asyncio
 import base64
+import hashlib
+import os
 import re
 import sys
 import tempfile
+from contextlib import suppress
 from dataclasses import dataclass
-from functools import cached_property, lru_cache
+from functools import cached_property
+from io import BytesIO
 from itertools import chain
 from pathlib import Path
 from typing import NamedTuple, Iterable
+from urllib.parse import urlsplit
 
+import appdirs
 import httpx
 import tinycss
 import typer
-from fontTools.subset import load_font, Options, save_font, Subsetter
+import uharfbuzz as hb
+from cssselect import HTMLTranslator
+from fontTools.ttLib import TTFont, TTLibError
 from loguru import logger
-from parsel import Selector
-from tinycss.css21 import Declaration, AtRule, RuleSet
+from lxml import etree
+from tinycss.css21 import Declaration, AtRule, RuleSet, Stylesheet
 
-httpx_client = httpx.AsyncClient()
+try:
+    from pybase64 import b64encode_as_string
+except ImportError:  # pragma: no cover - pybase64 is optional at runtime
+
+    def b64encode_as_string(s: bytes) -> str:  # type: ignore[misc]
+        return base64.b64encode(s).decode("ascii")
+
+
+# Directory where downloaded fonts are cached
+FONT_CACHE_DIR = Path(appdirs.user_cache_dir("svgfontembed"))
+# Signatures at the start of the font files we accept (TrueType, OpenType, WOFF and WOFF2)
+FONT_FILE_SIGNATURES = (b"\x00\x01\x00\x00", b"OTTO", b"true", b"wOFF", b"wOF2")
+
+# Size of the chunks fonts are downloaded in
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+_httpx_client: httpx.AsyncClient | None = None
+
+# Font downloads in progress, by URL, so that concurrent requests for a font share one download
+_font_downloads: dict[str, asyncio.Future[bytes]] = {}
+
+
+def get_font_cache_file(url: str) -> Path:
+    """Gets the path where a font is cached on disk, keyed by its source URL.
+
+    Args:
+        url: The source URL of the font.
+
+    Returns:
+        The path of the cached font file, which may not exist yet.
+    """
+    url_hash = hashlib.sha256(url.encode()).hexdigest()
+    return FONT_CACHE_DIR / (url_hash + Path(urlsplit(url).path).suffix)
+
+
+def is_font_file(contents: bytes) -> bool:
+    """Checks whether some contents look like a font file, judging by their signature.
+
+    Args:
+        contents: The contents to check.
+
+    Returns:
+        Whether the contents start with the signature of a TrueType, OpenType, WOFF or WOFF2
+        font.
+    """
+    return contents[:4] in FONT_FILE_SIGNATURES
+
+
+def _write_font_cache_file(cache_file: Path, font_contents: bytes) -> None:
+    # Write to a temporary file and move it into place, so that an interrupted or concurrent
+    # run never leaves a truncated font in the cache
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=cache_file.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(font_contents)
+        os.replace(tmp_name, cache_file)
+    except BaseException:
+        with suppress(OSError):
+            os.unlink(tmp_name)
+        raise
+
+
+def get_httpx_client() -> httpx.AsyncClient:
+    """Gets the shared HTTP client, creating it on first use.
+
+    Fonts are usually served from a handful of hosts, so the client uses HTTP/2 and keeps
+    connections alive to reuse them across downloads.
+    """
+    global _httpx_client
+    if _httpx_client is None:
+        _httpx_client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+            timeout=30.0,
+        )
+    return _httpx_client
+
+
+async def close_httpx_client() -> None:
+    """Closes the shared HTTP client, if it was created."""
+    global _httpx_client
+    if _httpx_client is not None:
+        await _httpx_client.aclose()
+        _httpx_client = None
 
 
 # About using regexes to parse XML: don't try this at home, kids.
@@ -28,64 +120,80 @@ httpx_client = httpx.AsyncClient()
 font_face_regex = re.compile(r"@font-face\s*{[^}]*}", re.MULTILINE)
 # Regex to extract the src url from the font-face
 src_regex = re.compile(r"src:\s*url\(([^)]*)\)")
+# Regex to match the whole src declaration, when it's a single url
+src_declaration_regex = re.compile(r"src:\s*url\(([^)]*)\)\s*;")
 # Regex to extract the font-family
 font_family_regex = re.compile(r"font-family:\s*([^;]*)")
+# Regex to find decimal and hexadecimal character references
+escaped_unicode_regex = re.compile(r"&#(?:(\d{1,8})|x([0-9a-fA-F]{1,8}));")
 
+_CSS_PARSER = tinycss.make_parser()
+_CSS_TRANSLATOR = HTMLTranslator()
+# XPath to get the text of elements with a given font-family attribute
+_FAMILY_TEXT_XPATH = etree.XPath(".//text[contains(@font-family, $family)]/text()")
+# XPath to get all the text in the SVG
+_TEXT_XPATH = etree.XPath(".//text/text()")
+# XPath to get the contents of the style elements
+_STYLE_XPATH = etree.XPath(".//style/text()")
 
-def get_text_from_svg(svg_contents: str, family: str | None = None) -> list[str]:
-    """Extracts all the text contents in an SVG file.
+
+def parse_svg(svg_contents: str) -> etree._Element:
+    """Parses an SVG file into an element tree.
+
+    The SVG is parsed leniently with lxml's HTML parser, so element names can be matched
+    without namespaces.
 
     Args:
         svg_contents: A string containing the contents of an SVG file.
+
+    Returns:
+        The root element of the parsed SVG.
+    """
+    parser = etree.HTMLParser(recover=True, encoding="utf-8")
+    body = svg_contents.strip().replace("\x00", "").encode("utf-8")
+    root = etree.fromstring(body, parser=parser)
+    if root is None:
+        root = etree.fromstring(b"<html/>", parser=parser)
+    return root
+
+
+def parse_stylesheets(root: etree._Element) -> list[Stylesheet]:
+    """Parses all the stylesheets in an SVG file.
+
+    Args:
+        root: The root element of the SVG file, as returned by `parse_svg`.
+
+    Returns:
+        A list of the parsed stylesheets, one for each `<style>` element.
+    """
+    return [_CSS_PARSER.parse_stylesheet(css) for css in _STYLE_XPATH(root)]
+
+
+def get_text_from_svg(
+    root: etree._Element,
+    family: str | None = None,
+    stylesheets: list[Stylesheet] | None = None,
+) -> list[str]:
+    """Extracts all the text contents in an SVG file.
+
+    Args:
+        root: The root element of the SVG file, as returned by `parse_svg`.
         family: The font family to filter the text by. If not provided, all text in the SVG file will be returned.
+        stylesheets: The parsed stylesheets of the SVG file, as returned by `parse_stylesheets`.
+            If not provided, they're parsed from `root`.
 
     Returns:
         A list of strings representing the text contents of the SVG file.
     """
-    sel = Selector(svg_contents)
     if family:
         # Get text elements with a font-family attribute
-        font_text = sel.xpath(f".//text[contains(@font-family, '{family}')]/text()").getall()
+        font_text = _FAMILY_TEXT_XPATH(root, family=family)
+
+        if stylesheets is None:
+            stylesheets = parse_stylesheets(root)
 
         # Get text elements matching a selector that uses the font-family
-        for css in sel.css("style::text"):
-            # todo - parse from ((?:local\(([^)]+)\)|url\(([^)]+)\))(?:[^;]+;\s*))*
-            # re.compile(r"^\s*src:\s*((?:local|url\([^)]+\))(?:[^;]+;))", re.MULTILINE | re.DOTALL)
-            re_font_src_contents = re.compile(
-                # Match the string "src:" at the beginning of the line, possibly
-                # preceded by any number of whitespace characters
-                r"^\s*src:\s*"
-                # Match zero or more repetitions of a non-capturing group that
-                # consists of either the string "local" or a "url(<content>)"
-                # pattern, followed by any number of characters that are not a
-                # semicolon (;) and a semicolon with any number of preceding
-                # whitespace characters
-                r"((?:local|url\([^)]+\))[^;]+;)",
-                # Set the re.MULTILINE and re.DOTALL flags
-                re.MULTILINE | re.DOTALL,
-            )
-            for match in re_font_src_contents.finditer(css.get()):
-                src = match.group(1)
-                re_contents = re.compile(
-                    # Match the string "local(" followed by any number of characters that
-                    # are not a closing parenthesis, followed by a closing parenthesis
-                    # and capture the contents in a named capture group "local"
-                    r"local\((?P<local>[^)]+)\)|"
-                    # Match the string "url(" followed by any number of characters that
-                    # are not a closing parenthesis, followed by a closing parenthesis
-                    # and capture the contents in a named capture group "url"
-                    r"url\((?P<url>[^)]+)\)",
-                    # Set the re.VERBOSE flag
-                    re.VERBOSE,
-                )
-                groupdict = re_contents.search(src).groupdict()
-                list(m.groupdict() for m in re_contents.finditer(src))
-                # todo - get all occurences of each of local, url; groupdict is
-                #  only the first of each
-
-                print(src)
-
-            stylesheet = tinycss.make_parser().parse_stylesheet(css.get())
+        for stylesheet in stylesheets:
             declarations: Iterable[tuple[RuleSet, Declaration]]
             declarations = (
                 (rule, declaration)
@@ -98,7 +206,8 @@ def get_text_from_svg(svg_contents: str, family: str | None = None) -> list[str]
                 value = declaration.value.as_css()
                 logger.debug(f"Found font-family usage: {value}")
                 selector_css = rule.selector.as_css()
-                rule_text = sel.css(selector_css).css("::text").getall()
+                selector_xpath = _CSS_TRANSLATOR.css_to_xpath(selector_css)
+                rule_text = root.xpath(f"({selector_xpath})/descendant-or-self::text()")
                 font_text.extend(rule_text)
                 # todo (maybe) - Currently, we get all characters of all variations
                 #  of the font. For instance, if the same font family uses bold and
@@ -111,7 +220,7 @@ def get_text_from_svg(svg_contents: str, family: str | None = None) -> list[str]
         return font_text
     #
     else:
-        return Selector(svg_contents).xpath(".//text/text()").getall()
+        return _TEXT_XPATH(root)
 
 
 @dataclass
@@ -153,41 +262,118 @@ class FontFace:
 
     @classmethod
     def from_svg(cls, svg_contents: str) -> tuple[FontFace, ...]:
+        # Cheap check to skip the regex scan on SVGs without any font-faces
+        if "@font-face" not in svg_contents:
+            return ()
         return tuple(FontFace(definition) for definition in font_face_regex.findall(svg_contents))
 
-    @lru_cache(maxsize=1)
-    async def get_font_contents(self) -> bytes | None:
+    async def get_font_contents(self, use_cache: bool = True) -> bytes | None:
         """Asynchronously downloads the font file from the source URL specified in the font-face
         definition.
 
+        Concurrent calls for the same URL, including from different font faces, share a single
+        download. Downloaded fonts are also cached on disk, keyed by their URL, and reused in
+        later runs.
+
+        Args:
+            use_cache: Whether to read and write the font from and to the disk cache.
+
         Returns:
             The contents of the font file.
         """
-
         if not self.src_url:
             logger.warning(f"Font face {self.font_family} has no src url.")
             return None
 
-        self.font_file_name = Path(self.src_url).name
-
-        logger.info(f"Downloading self {self.font_family} from {self.src_url}")
-        font_req = await httpx_client.get(self.src_url)
-        font_req.raise_for_status()
-        font_contents = await font_req.aread()
+        src_url = self.src_url
+        self.font_file_name = Path(urlsplit(src_url).path).name
+
+        if (task := _font_downloads.get(src_url)) is None:
+            task = asyncio.ensure_future(self._fetch_font_contents(src_url, use_cache))
+            _font_downloads[src_url] = task
+            task.add_done_callback(lambda _: _font_downloads.pop(src_url, None))
+        # Shielded so that a cancelled caller doesn't cancel the download for everyone else
+        return await asyncio.shield(task)
+
+    async def _fetch_font_contents(self, src_url: str, use_cache: bool) -> bytes:
+        cache_file = get_font_cache_file(src_url)
+        if use_cache and cache_file.is_file():
+            logger.info(f"Using cached font {self.font_family} from {cache_file}")
+            return cache_file.read_bytes()
+
+        logger.info(f"Downloading self {self.font_family} from {src_url}")
+        async with get_httpx_client().stream("GET", src_url) as font_req:
+            font_req.raise_for_status()
+            chunks = [chunk async for chunk in font_req.aiter_bytes(DOWNLOAD_CHUNK_SIZE)]
+        font_contents = b"".join(chunks)
         logger.info(f"Font downloaded: {self.font_family} ({len(font_contents) / 1024:.2f}kb)")
+
+        if not use_cache:
+            return font_contents
+        if not is_font_file(font_contents):
+            # Don't cache e.g. an error page, or every later run would keep failing on it
+            logger.warning(f"Downloaded file for {self.font_family} doesn't look like a font")
+            return font_contents
+        try:
+            _write_font_cache_file(cache_file, font_contents)
+        except OSError as e:
+            logger.warning(f"Unable to cache font {self.font_family}: {e}")
         return font_contents
 
     def __hash__(self) -> int:
         return hash(self.font_face_definition)
 
 
+def _convert_font_flavor(font_contents: bytes, flavor: str | None) -> bytes:
+    """Converts a font to the given flavor.
+
+    Args:
+        font_contents: The contents of the font file.
+        flavor: The flavor to convert to ("woff", "woff2"), or `None` for a plain sfnt font.
+
+    Returns:
+        The contents of the converted font.
+    """
+    font = TTFont(BytesIO(font_contents))
+    font.flavor = flavor
+    buffer = BytesIO()
+    font.save(buffer)
+    return buffer.getvalue()
+
+
+def _subset_font(font_contents: bytes, character_sets: list[set[str]]) -> list[bytes]:
+    """Subsets a font to each of the given sets of characters.
+
+    The font is only decompressed and loaded once, however many subsets are made of it.
+
+    Args:
+        font_contents: The contents of the original font file.
+        character_sets: The sets of characters to make a subset for.
+
+    Returns:
+        The contents of the subsetted fonts as woff2, one for each set of characters.
+    """
+    # HarfBuzz only reads sfnt fonts, so web fonts need to be decompressed first
+    if font_contents[:4] in (b"wOFF", b"wOF2"):
+        font_contents = _convert_font_flavor(font_contents, None)
+
+    face = hb.Face(font_contents)
+    subsets = []
+    for characters in character_sets:
+        subset_input = hb.SubsetInput()
+        subset_input.unicode_set.update(map(ord, characters))
+        subset_face = hb.subset(face, subset_input)
+        subsets.append(_convert_font_flavor(subset_face.blob.data, "woff2"))
+    return subsets
+
+
 class SubsetDefinitionResult(NamedTuple):
     svg_contents: str
     total_fonts_size: int
 
 
 async def get_font_subset_definition(
-    font_face: FontFace, characters: set[str]
+    font_face: FontFace, characters: set[str], use_cache: bool = True
 ) -> SubsetDefinitionResult | None:
     """Subsets a font file for a given set of characters and generates the font-face definition for
     the subsetted font.
@@ -195,44 +381,83 @@ async def get_font_subset_definition(
     Args:
         font_face: A `FontFace` object.
         characters: A set of characters to include in the font subset.
+        use_cache: Whether to use the disk cache for the font file.
 
     Returns:
         A `SubsetDefinitionResult` object containing the subsetted SVG contents and the total
             size of the subsetted fonts. If the font file cannot be downloaded or subsetted,
             `None` is returned.
     """
+    results = await get_font_subset_definitions([(font_face, characters)], use_cache)
+    return results[0]
+
+
+async def get_font_subset_definitions(
+    font_faces: list[tuple[FontFace, set[str]]], use_cache: bool = True
+) -> list[SubsetDefinitionResult | None]:
+    """Like `get_font_subset_definition`, for several font faces sharing the same font file.
+
+    The font file is downloaded, decompressed and loaded once for all the font faces.
+
+    Args:
+        font_faces: Pairs of `FontFace` objects with the same source URL, and the set of
+            characters to include in the font subset for each.
+        use_cache: Whether to use the disk cache for the font file.
+
+    Returns:
+        A `SubsetDefinitionResult` or `None` for each font face, as returned by
+            `get_font_subset_definition`.
+    """
+    results: list[SubsetDefinitionResult | None] = [None] * len(font_faces)
+    to_subset = []
+    for i, (font_face, characters) in enumerate(font_faces):
+        src_match = src_declaration_regex.search(font_face.font_face_definition)
+        if src_match is None:
+            logger.warning(f"Unable to find the src of {font_face.font_family}, skipping")
+        else:
+            to_subset.append((i, font_face, characters, src_match))
+    if not to_subset:
+        return results
 
-    font_contents = await font_face.get_font_contents()
+    first_face = to_subset[0][1]
+    font_contents = await first_face.get_font_contents(use_cache)
 
     if not font_contents:
-        logger.warning(f"Unable to get font for {font_face.font_family}, skipping")
-        return None
+        logger.warning(f"Unable to get font for {first_face.font_family}, skipping")
+        return results
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        tmpdir_path = Path(tmpdir)
-        name_from_url = font_face.src_url.split("/")[-1] if font_face.src_url else None
-        font_file_name = name_from_url or font_face.font_file_name or "font.woff2"
-        font_file = tmpdir_path / font_file_name
-        font_size = font_file.write_bytes(font_contents)
-        options = Options(flavor="woff2")
-        font = load_font(font_file, options)
-        subsetter = Subsetter(options)
-        subsetter.populate(text="".join(characters))
-        subsetter.subset(font)
-
-        subset_file = tmpdir_path / "subset.woff2"
-        save_font(font, subset_file, options=subsetter.options)
+    font_size = len(font_contents)
+
+    # Subsetting is CPU-bound; run it off the event loop so other faces can download meanwhile.
+    try:
+        subsets = await asyncio.to_thread(
+            _subset_font, font_contents, [characters for _, _, characters, _ in to_subset]
+        )
+    except (RuntimeError, TTLibError) as e:
+        logger.warning(f"Unable to subset font for {first_face.font_family}, skipping: {e}")
+        return results
+
+    for (i, font_face, characters, src_match), bs in zip(to_subset, subsets):
         message = (
             f"Success! {font_face.font_family} subsetted to {len(characters)} characters."
-            f"File size: {subset_file.stat().st_size / 1024:.1f}kb "
-            f"(was {font_file.stat().st_size / 1024:.2f}kb)"
+            f"File size: {len(bs) / 1024:.1f}kb "
+            f"(was {font_size / 1024:.2f}kb)"
         )
         logger.success(message)
-        bs = subset_file.read_bytes()
-        encoded = base64.b64encode(bs).decode("utf-8")
-        src_line = f"src: url('data:font/woff2;base64,{encoded}') format('woff2');"
-        result = re.sub(r"src:\s*url\(([^)]*)\)\s*;", src_line, font_face.font_face_definition)
-        return SubsetDefinitionResult(result, font_size)
+        # Splice the base64 data straight into the definition, so the (potentially large)
+        # encoded font is only copied once
+        definition = font_face.font_face_definition
+        result = "".join(
+            (
+                definition[: src_match.start()],
+                "src: url('data:font/woff2;base64,",
+                b64encode_as_string(bs),
+                "') format('woff2');",
+                definition[src_match.end() :],
+            )
+        )
+        results[i] = SubsetDefinitionResult(result, font_size)
+    return results
 
 
 def replace_escaped_unicode(svg_contents: str) -> str:
@@ -247,8 +472,87 @@ def replace_escaped_unicode(svg_contents: str) -> str:
     Returns:
         The SVG contents with the escaped unicode characters replaced.
     """
-    svg_contents = re.sub(r"&#(\d+);", lambda g: chr(int(g.group(1))), svg_contents)
-    return svg_contents
+    if "&#" not in svg_contents:
+        return svg_contents
+    return escaped_unicode_regex.sub(_unescape_char_ref, svg_contents)
+
+
+def _unescape_char_ref(match: re.Match[str]) -> str:
+    if match.group(1) is not None:
+        codepoint = int(match.group(1))
+    else:
+        codepoint = int(match.group(2), 16)
+    # Leave references alone if they aren't valid XML characters (e.g. NUL, surrogates or out
+    # of range), if the character has a meaning in XML markup, or if it's whitespace that XML
+    # parsers would normalize when it's written literally
+    if not _is_xml_char(codepoint) or chr(codepoint) in "<>&\"'\t\n\r":
+        return match.group(0)
+    return chr(codepoint)
+
+
+def _is_xml_char(codepoint: int) -> bool:
+    return (
+        codepoint in (0x9, 0xA, 0xD)
+        or 0x20 <= codepoint <= 0xD7FF
+        or 0xE000 <= codepoint <= 0xFFFD
+        or 0x10000 <= codepoint <= 0x10FFFF
+    )
+
+
+async def get_remote_font_size(font_face: FontFace, use_cache: bool = True) -> int:
+    """Gets the size of a font file without downloading it.
+
+    The size is taken from the disk cache if the font was downloaded before, and from a HEAD
+    request otherwise.
+
+    Args:
+        font_face: A `FontFace` object.
+        use_cache: Whether to look for the font in the disk cache.
+
+    Returns:
+        The size of the font file in bytes, or 0 if it can't be determined.
+    """
+    if not font_face.src_url:
+        return 0
+    cache_file = get_font_cache_file(font_face.src_url)
+    if use_cache and cache_file.is_file():
+        font_size = cache_file.stat().st_size
+    else:
+        try:
+            req = await get_httpx_client().head(font_face.src_url)
+            font_size = int(req.headers.get("content-length", 0))
+        except (httpx.HTTPError, ValueError, TypeError):
+            logger.warning(f"Unable to get size of {font_face.src_url}")
+            return 0
+    logger.success(f"Saved {font_size / 1024:.2f}kb by removing unused font")
+    return font_size
+
+
+def replace_font_faces(svg_contents: str, replacements: dict[str, str]) -> str:
+    """Replaces font-face definitions in an SVG file in a single pass.
+
+    Args:
+        svg_contents: The SVG file contents.
+        replacements: A mapping of font-face definitions to their replacements. Definitions
+            not in the mapping are left unchanged.
+
+    Returns:
+        The SVG contents with the font-face definitions replaced.
+    """
+    if not replacements:
+        return svg_contents
+
+    parts = []
+    last_end = 0
+    for match in font_face_regex.finditer(svg_contents):
+        replacement = replacements.get(match.group(0))
+        if replacement is None:
+            continue
+        parts.append(svg_contents[last_end : match.start()])
+        parts.append(replacement)
+        last_end = match.end()
+    parts.append(svg_contents[last_end:])
+    return "".join(parts)
 
 
 class EmbedFontsResult(NamedTuple):
@@ -256,7 +560,9 @@ class EmbedFontsResult(NamedTuple):
     total_fonts_size: int
 
 
-async def embed_fonts(svg_contents: str, keep_unused_fonts: bool) -> EmbedFontsResult:
+async def embed_fonts(
+    svg_contents: str, keep_unused_fonts: bool, use_cache: bool = True
+) -> EmbedFontsResult:
     """Embeds fonts in an SVG file.
 
     This function handles the process of downloading and subseting fonts, and replacing the
@@ -265,6 +571,7 @@ async def embed_fonts(svg_contents: str, keep_unused_fonts: bool) -> EmbedFontsR
     Args:
         svg_contents: The SVG file contents.
         keep_unused_fonts: Whether to keep fonts that are not used in the SVG file.
+        use_cache: Whether to use the disk cache for downloaded fonts.
 
     Returns:
         An `EmbedFontsResult` object containing the SVG contents with embedded fonts and the
@@ -279,13 +586,26 @@ async def embed_fonts(svg_contents: str, keep_unused_fonts: bool) -> EmbedFontsR
     if not families:
         logger.warning("No fonts found in SVG")
         # raise typer.Exit(1)
-    else:
-        logger.info(f"Found {len(font_faces)} font faces: {', '.join(families)}")
+        return EmbedFontsResult(svg_contents, total_fonts_size)
+
+    logger.info(f"Found {len(font_faces)} font faces: {', '.join(families)}")
+
+    # Parse the SVG and its stylesheets once, and share them between all font faces
+    root = parse_svg(svg_contents)
+    stylesheets = parse_stylesheets(root)
+    texts_by_family: dict[str | None, list[str]] = {}
 
     to_process = []
+    unused_faces = []
+    # Maps font-face definitions to what they should be replaced with in the output
+    replacements: dict[str, str] = {}
     for face in font_faces:
-        text = get_text_from_svg(svg_contents, face.font_family)
-        characters = set("".join(text))
+        if face.font_family not in texts_by_family:
+            texts_by_family[face.font_family] = get_text_from_svg(
+                root, face.font_family, stylesheets
+            )
+        text = texts_by_family[face.font_family]
+        characters = set(chain.from_iterable(text))
         if characters:
             to_process.append((face, characters))
             logger.info(f"Font face {face.font_family} uses {len(characters)} unique characters.")
@@ -294,27 +614,41 @@ async def embed_fonts(svg_contents: str, keep_unused_fonts: bool) -> EmbedFontsR
                 logger.warning(f"Font face {face.font_family} has no used characters.")
                 logger.warning(r"I'll just throw this away ¯\_(ツ)_/¯)")
                 logger.warning(r"Set the --keep-unused-fonts flag to keep it.")
-                svg_contents = svg_contents.replace(face.font_face_definition, "")
-                try:
-                    if face.src_url:
-                        req = await httpx_client.head(face.src_url)
-                        total_fonts_size += int(req.headers.get("content-length", 0))
-                        logger.success(
-                            f"Saved {total_fonts_size / 1024:.2f}kb by removing unused font"
-                        )
-                except (httpx.HTTPError, ValueError, TypeError):
-                    logger.warning(f"Unable to get size of {face.src_url}")
+                replacements[face.font_face_definition] = ""
+                unused_faces.append(face)
             else:
                 logger.warning(r"Keeping unused font face {face.font_family}.")
 
+    # Sizes of unused fonts are only needed for reporting, so they're fetched in the background
+    # while the used fonts are processed
+    unused_sizes = asyncio.gather(*(get_remote_font_size(face, use_cache) for face in unused_faces))
+
     logger.info(f"Processing {len(to_process)} font faces.")
+    # Font faces using the same font file (e.g. regular and bold variants defined with the same
+    # url) are subset together, so the font is only loaded once
+    faces_by_url: dict[str | None, list[tuple[FontFace, set[str]]]] = {}
     for face, characters in to_process:
-        subset_result = await get_font_subset_definition(face, characters)
-        if subset_result is None:
-            continue
-        subset_definition, original_font_size = subset_result
-        svg_contents = svg_contents.replace(face.font_face_definition, subset_definition)
-        total_fonts_size += original_font_size
+        faces_by_url.setdefault(face.src_url, []).append((face, characters))
+    try:
+        grouped_results = await asyncio.gather(
+            *(get_font_subset_definitions(faces, use_cache) for faces in faces_by_url.values())
+        )
+    except BaseException:
+        # Don't leave the size requests running (and the HTTP client in use) on the way out
+        unused_sizes.cancel()
+        await asyncio.gather(unused_sizes, return_exceptions=True)
+        raise
+    for faces, subset_results in zip(faces_by_url.values(), grouped_results):
+        for (face, _), subset_result in zip(faces, subset_results):
+            if subset_result is None:
+                continue
+            subset_definition, original_font_size = subset_result
+            replacements[face.font_face_definition] = subset_definition
+            total_fonts_size += original_font_size
+
+    total_fonts_size += sum(await unused_sizes)
+
+    svg_contents = replace_font_faces(svg_contents, replacements)
     return EmbedFontsResult(svg_contents, total_fonts_size)
 
 
@@ -323,6 +657,7 @@ async def main(
     keep_unused_fonts: bool,
     do_replace_escaped_unicode: bool,
     do_embed_fonts: bool,
+    use_cache: bool = True,
 ) -> str:
     """Main function.
 
@@ -332,6 +667,7 @@ async def main(
         do_replace_escaped_unicode: Whether to replace escaped unicode characters with their
             actual unicode characters.
         do_embed_fonts: Whether to embed fonts in the SVG file.
+        use_cache: Whether to use the disk cache for downloaded fonts.
 
     Returns:
         The SVG file contents with embedded fonts.
@@ -344,7 +680,10 @@ async def main(
         svg_contents = replace_escaped_unicode(svg_contents)
 
     if do_embed_fonts:
-        result = await embed_fonts(svg_contents, keep_unused_fonts)
+        try:
+            result = await embed_fonts(svg_contents, keep_unused_fonts, use_cache)
+        finally:
+            await close_httpx_client()
         svg_contents = result.svg_contents
         total_fonts_size = result.total_fonts_size
 
@@ -412,6 +751,11 @@ def svg_font_embed(
         "-u",
         help="Replace escaped unicode characters (e.g. `&#10245;` with their Unicode  )",
     ),
+    no_cache: bool = typer.Option(
+        False,
+        "--no-cache",
+        help="Download fonts again instead of using (and updating) the font cache.",
+    ),
 ) -> None:
     """Embed fonts in an SVG file, using only the subset of characters actually present.
 
@@ -454,6 +798,7 @@ def svg_font_embed(
             keep_unused_fonts=keep_unused_fonts,
             do_replace_escaped_unicode=do_replace_escaped_unicode,
             do_embed_fonts=do_embed_fonts,
+            use_cache=not no_cache,
         )
     )
 
@@ -465,4 +810,5 @@ def svg_font_embed(
     logger.success(f"Done! Wrote to {str(output) if output != Path('-') else 'stdout'}")
 
 
-app()
+if __name__ == "__main__":
+    app()
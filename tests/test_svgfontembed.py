@@ -0,0 +1,210 @@
+import asyncio
+import base64
+import re
+from io import BytesIO
+from pathlib import Path
+
+import httpx
+import pytest
+from fontTools.fontBuilder import FontBuilder
+from fontTools.pens.ttGlyphPen import TTGlyphPen
+from fontTools.ttLib import TTFont
+
+from svgfontembed import svgfontembed
+from svgfontembed.svgfontembed import (
+    FontFace,
+    embed_fonts,
+    get_font_cache_file,
+    get_font_subset_definition,
+    get_text_from_svg,
+    parse_svg,
+    replace_escaped_unicode,
+)
+
+
+def test_get_text_from_svg_grouped_selector() -> None:
+    svg = """
+    <svg xmlns="http://www.w3.org/2000/svg">
+      <style>
+        .foo, .baz { font-family: LatoB; }
+      </style>
+      <text class="foo">ab<tspan>c</tspan></text>
+      <text class="bar">xyz</text>
+      <text class="baz">d</text>
+    </svg>
+    """
+    text = get_text_from_svg(parse_svg(svg), "LatoB")
+    assert all(isinstance(t, str) for t in text)
+    assert set("".join(text)) == set("abcd")
+
+
+@pytest.mark.parametrize(
+    ("svg", "expected"),
+    [
+        ("&#10245;", "⠅"),
+        ("&#x2019;", "’"),
+        ("a&#98;c", "abc"),
+        # Characters with a meaning in XML markup stay escaped
+        ("&#60;&#x3E;&#38;&#34;&#39;", "&#60;&#x3E;&#38;&#34;&#39;"),
+        # Whitespace that XML parsers would normalize stays escaped
+        ("&#9;&#10;&#13;&#xA;", "&#9;&#10;&#13;&#xA;"),
+        # Only a lowercase x introduces a hexadecimal reference in XML
+        ("&#X41;", "&#X41;"),
+        # References that aren't valid XML characters are left as they are
+        ("&#0;", "&#0;"),
+        ("&#xD800;", "&#xD800;"),
+        ("&#x110000;", "&#x110000;"),
+        ("&#99999999;", "&#99999999;"),
+        ("&#" + "9" * 5000 + ";", "&#" + "9" * 5000 + ";"),
+        ("&amp;", "&amp;"),
+    ],
+)
+def test_replace_escaped_unicode(svg: str, expected: str) -> None:
+    assert replace_escaped_unicode(svg) == expected
+
+
+def test_font_faces_with_same_url_share_download(monkeypatch: pytest.MonkeyPatch) -> None:
+    fetched_urls = []
+
+    async def fetch_font_contents(self: FontFace, src_url: str, use_cache: bool) -> bytes:
+        fetched_urls.append(src_url)
+        await asyncio.sleep(0.01)
+        return b"font"
+
+    monkeypatch.setattr(FontFace, "_fetch_font_contents", fetch_font_contents)
+    regular = FontFace('@font-face { font-family: "A"; src: url("https://x.com/a.woff2"); }')
+    bold = FontFace('@font-face { font-family: "B"; src: url("https://x.com/a.woff2"); }')
+
+    async def get_contents() -> list[bytes | None]:
+        return await asyncio.gather(regular.get_font_contents(), bold.get_font_contents())
+
+    assert asyncio.run(get_contents()) == [b"font", b"font"]
+    assert fetched_urls == ["https://x.com/a.woff2"]
+
+
+@pytest.fixture
+def font_server(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> dict[str, bytes]:
+    """Serves fonts from a dict of URLs to contents, with the font cache in a temp dir."""
+    fonts: dict[str, bytes] = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if (contents := fonts.get(str(request.url))) is None:
+            return httpx.Response(404)
+        return httpx.Response(200, content=contents)
+
+    monkeypatch.setattr(svgfontembed, "FONT_CACHE_DIR", tmp_path)
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(svgfontembed, "_httpx_client", client)
+    return fonts
+
+
+def get_font_contents(url: str, use_cache: bool = True) -> bytes | None:
+    face = FontFace(f'@font-face {{ font-family: "A"; src: url("{url}"); }}')
+    return asyncio.run(face.get_font_contents(use_cache))
+
+
+def test_font_cache_miss_downloads_and_caches(font_server: dict[str, bytes]) -> None:
+    url = "https://x.com/a.woff2?v=1"
+    font_server[url] = b"wOF2font"
+
+    assert get_font_contents(url) == b"wOF2font"
+    assert get_font_cache_file(url).read_bytes() == b"wOF2font"
+    assert get_font_cache_file(url).suffix == ".woff2"
+
+
+def test_font_cache_hit_skips_download(font_server: dict[str, bytes]) -> None:
+    url = "https://x.com/a.woff2"
+    get_font_cache_file(url).write_bytes(b"wOF2cached")
+
+    assert get_font_contents(url) == b"wOF2cached"
+
+
+def test_font_cache_not_used_with_no_cache(font_server: dict[str, bytes]) -> None:
+    url = "https://x.com/a.woff2"
+    font_server[url] = b"wOF2fresh"
+    get_font_cache_file(url).write_bytes(b"wOF2cached")
+
+    assert get_font_contents(url, use_cache=False) == b"wOF2fresh"
+    assert get_font_cache_file(url).read_bytes() == b"wOF2cached"
+
+
+def test_font_cache_skips_files_that_are_not_fonts(font_server: dict[str, bytes]) -> None:
+    url = "https://x.com/a.woff2"
+    font_server[url] = b"<html>Please log in</html>"
+
+    assert get_font_contents(url) == b"<html>Please log in</html>"
+    assert not get_font_cache_file(url).exists()
+
+
+@pytest.mark.parametrize("contents", [b"<html>Please log in</html>", b"wOF2 but not really"])
+def test_get_font_subset_definition_bad_font(
+    monkeypatch: pytest.MonkeyPatch, contents: bytes
+) -> None:
+    async def get_font_contents(self: FontFace, use_cache: bool = True) -> bytes:
+        return contents
+
+    monkeypatch.setattr(FontFace, "get_font_contents", get_font_contents)
+    face = FontFace('@font-face { font-family: "A"; src: url("https://x.com/a.woff2"); }')
+
+    assert asyncio.run(get_font_subset_definition(face, {"a"})) is None
+
+
+def make_woff2_font(characters: str) -> bytes:
+    glyph_order = [".notdef"] + [f"g{ord(c)}" for c in characters]
+    pen = TTGlyphPen(None)
+    pen.moveTo((0, 0))
+    pen.lineTo((0, 500))
+    pen.lineTo((500, 0))
+    pen.closePath()
+    glyph = pen.glyph()
+
+    fb = FontBuilder(1000, isTTF=True)
+    fb.setupGlyphOrder(glyph_order)
+    fb.setupCharacterMap({ord(c): f"g{ord(c)}" for c in characters})
+    fb.setupGlyf({name: glyph for name in glyph_order})
+    fb.setupHorizontalMetrics({name: (500, 0) for name in glyph_order})
+    fb.setupHorizontalHeader(ascent=800, descent=-200)
+    fb.setupNameTable({"familyName": "Test", "styleName": "Regular"})
+    fb.setupOS2()
+    fb.setupPost()
+    fb.font.flavor = "woff2"
+    buffer = BytesIO()
+    fb.save(buffer)
+    return buffer.getvalue()
+
+
+def test_embed_fonts_shared_font_is_loaded_once(
+    font_server: dict[str, bytes], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    url = "https://x.com/font.woff2"
+    font_server[url] = make_woff2_font("abcdef")
+    svg = f"""
+    <svg xmlns="http://www.w3.org/2000/svg">
+      <style>
+        @font-face {{ font-family: "Regular"; src: url("{url}"); }}
+        @font-face {{ font-family: "Bold"; src: url("{url}"); }}
+      </style>
+      <text font-family="Regular">ab</text>
+      <text font-family="Bold">cd</text>
+    </svg>
+    """
+
+    decompressed = []
+    convert_font_flavor = svgfontembed._convert_font_flavor
+
+    def counting_convert_font_flavor(font_contents: bytes, flavor: str | None) -> bytes:
+        if flavor is None:
+            decompressed.append(font_contents)
+        return convert_font_flavor(font_contents, flavor)
+
+    monkeypatch.setattr(svgfontembed, "_convert_font_flavor", counting_convert_font_flavor)
+
+    result = asyncio.run(embed_fonts(svg, keep_unused_fonts=False))
+
+    assert len(decompressed) == 1
+    embedded = re.findall(r"base64,([^']+)'", result.svg_contents)
+    assert len(embedded) == 2
+    cmaps = [
+        set(TTFont(BytesIO(base64.b64decode(data))).getBestCmap()) for data in embedded
+    ]
+    assert cmaps == [set(map(ord, "ab")), set(map(ord, "cd"))]